@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
-import json
+import copy
 import os
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from typing import Any
 
 import anthropic
+import orjson
 
 from gourmAgent.tools import places as places_tools
 from gourmAgent.tools import prefs as prefs_tools
@@ -51,7 +55,30 @@ def _get_client() -> anthropic.Anthropic:
     return _client
 
 
-ALL_TOOLS = places_tools.TOOLS + prefs_tools.TOOLS
+# Prompt caching: tools and the system prompt are identical on every request,
+# so mark the end of each with a cache breakpoint and let the server reuse the
+# cached prefix across loop iterations and turns.
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _freeze_tools(tools: list[dict[str, Any]]) -> tuple[Mapping[str, Any], ...]:
+    """Freeze tool schemas, adding a cache breakpoint after the last one.
+
+    Each schema is deep-copied first, so ALL_TOOLS shares no nested dicts with
+    the tool modules' TOOLS lists. Only the top level of each copy is read-only.
+    """
+    *head, last = copy.deepcopy(tools)
+    return tuple(
+        MappingProxyType(tool) for tool in [*head, {**last, "cache_control": _CACHE_CONTROL}]
+    )
+
+
+# Built once at import: the same schemas are sent on every loop iteration.
+ALL_TOOLS: tuple[Mapping[str, Any], ...] = _freeze_tools(places_tools.TOOLS + prefs_tools.TOOLS)
+
+_SYSTEM_BLOCKS: list[dict[str, Any]] = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": _CACHE_CONTROL}
+]
 
 _TOOL_DISPATCH: dict[str, Any] = {
     "search_restaurants": places_tools.search_restaurants,
@@ -68,6 +95,78 @@ def _dispatch_tool(name: str, inputs: dict[str, Any]) -> Any:
     return fn(**inputs)
 
 
+def _safe_dispatch(tu: Any) -> tuple[str, bool]:
+    """Run a single tool_use block, returning (result_content, is_error)."""
+    try:
+        result = _dispatch_tool(tu.name, tu.input)
+        return orjson.dumps(result).decode(), False
+    except Exception as exc:
+        return orjson.dumps({"error": str(exc)}).decode(), True
+
+
+def _call_key(tu: Any) -> str:
+    """Identify a tool call by its name and canonical (key-sorted) JSON inputs."""
+    return f"{tu.name}:{orjson.dumps(tu.input, option=orjson.OPT_SORT_KEYS).decode()}"
+
+
+def _execute_tools(tool_uses: list[Any]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Execute one response's tool_use blocks.
+
+    Calls with the same tool name and inputs run once; every duplicate gets
+    its own tool_result carrying the shared outcome.
+
+    Returns:
+        (tool_calls, tool_results) — log entries for the caller and the
+        tool_result blocks to send back to Claude, both in tool_use order.
+    """
+    keys = [_call_key(tu) for tu in tool_uses]
+    unique: dict[str, Any] = {}
+    for key, tu in zip(keys, tool_uses):
+        unique.setdefault(key, tu)
+
+    # Execute tools concurrently (they are I/O bound); map preserves order, so
+    # outcomes line up with unique's keys.
+    with ThreadPoolExecutor(max_workers=len(unique)) as executor:
+        seen = dict(zip(unique, executor.map(_safe_dispatch, unique.values())))
+    outcomes = [seen[key] for key in keys]
+
+    tool_calls: list[dict[str, Any]] = []
+    tool_results: list[dict[str, Any]] = []
+    for tu, (result_content, is_error) in zip(tool_uses, outcomes):
+        tool_calls.append(
+            {"tool": tu.name, "input": tu.input, "output": result_content, "error": is_error}
+        )
+        tool_results.append(
+            {
+                "type": "tool_result",
+                "tool_use_id": tu.id,
+                "content": result_content,
+                "is_error": is_error,
+            }
+        )
+    return tool_calls, tool_results
+
+
+def _initial_messages(user_id: str, message: str, location: str) -> list[dict[str, Any]]:
+    return [
+        {
+            "role": "user",
+            "content": f"[user_id={user_id}] [location={location}]\n\n{message}",
+        }
+    ]
+
+
+def _request_params(messages: list[dict[str, Any]]) -> dict[str, Any]:
+    """Keyword arguments shared by messages.create and messages.stream."""
+    return {
+        "model": os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-6"),
+        "max_tokens": 4096,
+        "system": _SYSTEM_BLOCKS,
+        "tools": ALL_TOOLS,
+        "messages": messages,
+    }
+
+
 def run(user_id: str, message: str, location: str) -> dict[str, Any]:
     """Run one turn of the agent.
 
@@ -82,23 +181,12 @@ def run(user_id: str, message: str, location: str) -> dict[str, Any]:
           - tool_calls (list): All tool calls made during this turn
     """
     client = _get_client()
-    messages: list[dict[str, Any]] = [
-        {
-            "role": "user",
-            "content": f"[user_id={user_id}] [location={location}]\n\n{message}",
-        }
-    ]
+    messages = _initial_messages(user_id, message, location)
 
     tool_calls_log: list[dict[str, Any]] = []
 
     while True:
-        response = client.messages.create(
-            model=os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-6"),
-            max_tokens=4096,
-            system=SYSTEM_PROMPT,
-            tools=ALL_TOOLS,
-            messages=messages,
-        )
+        response = client.messages.create(**_request_params(messages))
 
         # Collect any tool uses from this response
         tool_uses = [block for block in response.content if block.type == "tool_use"]
@@ -112,27 +200,49 @@ def run(user_id: str, message: str, location: str) -> dict[str, Any]:
         # Append assistant message with tool_use blocks
         messages.append({"role": "assistant", "content": response.content})
 
-        # Execute tools and build tool_result blocks
-        tool_results: list[dict[str, Any]] = []
-        for tu in tool_uses:
-            try:
-                result = _dispatch_tool(tu.name, tu.input)
-                result_content = json.dumps(result)
-                is_error = False
-            except Exception as exc:
-                result_content = json.dumps({"error": str(exc)})
-                is_error = True
-
-            tool_calls_log.append(
-                {"tool": tu.name, "input": tu.input, "output": result_content, "error": is_error}
-            )
-            tool_results.append(
-                {
-                    "type": "tool_result",
-                    "tool_use_id": tu.id,
-                    "content": result_content,
-                    "is_error": is_error,
-                }
-            )
+        tool_calls, tool_results = _execute_tools(tool_uses)
+        tool_calls_log.extend(tool_calls)
+
+        messages.append({"role": "user", "content": tool_results})
+
+
+def run_stream(user_id: str, message: str, location: str) -> Iterator[dict[str, Any]]:
+    """Run one turn of the agent, yielding events as Claude's response streams in.
+
+    Same loop as run(), but text is surfaced as it is generated instead of
+    after the whole message has been buffered.
+
+    Yields:
+        Event dicts, distinguished by "type":
+          - text: {"type": "text", "text": str} — a streamed text delta
+          - tool_call: {"type": "tool_call", **tool_call} — a completed tool call
+          - done: {"type": "done", "response": str, "tool_calls": list} — same
+            payload as run() returns, emitted once at the end
+    """
+    client = _get_client()
+    messages = _initial_messages(user_id, message, location)
+
+    tool_calls_log: list[dict[str, Any]] = []
+
+    while True:
+        with client.messages.stream(**_request_params(messages)) as stream:
+            for text in stream.text_stream:
+                yield {"type": "text", "text": text}
+            response = stream.get_final_message()
+
+        tool_uses = [block for block in response.content if block.type == "tool_use"]
+
+        if response.stop_reason == "end_turn" or not tool_uses:
+            text_blocks = [block.text for block in response.content if block.type == "text"]
+            final_text = "\n".join(text_blocks)
+            yield {"type": "done", "response": final_text, "tool_calls": tool_calls_log}
+            return
+
+        messages.append({"role": "assistant", "content": response.content})
+
+        tool_calls, tool_results = _execute_tools(tool_uses)
+        tool_calls_log.extend(tool_calls)
+        for tool_call in tool_calls:
+            yield {"type": "tool_call", **tool_call}
 
         messages.append({"role": "user", "content": tool_results})
@@ -5,21 +5,44 @@ from __future__ import annotations
 import os
 from datetime import datetime
 
+import orjson
 from sqlalchemy import (
-    JSON,
     Boolean,
     DateTime,
     Float,
     ForeignKey,
     String,
     create_engine,
+    event,
+    inspect,
+    text,
 )
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship
+from sqlalchemy.pool import QueuePool
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./gourmAgent.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Keep a small pool of long-lived connections so SQLite's page cache stays warm
+# across tool calls instead of being rebuilt on every connect.
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=QueuePool,
+    pool_size=8,
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False},
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")  # 64 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 
 class Base(DeclarativeBase):
@@ -35,26 +58,42 @@ class User(Base):
     preferences: Mapped[list[Preference]] = relationship(
         "Preference", back_populates="user", cascade="all, delete-orphan"
     )
+    tags: Mapped[list[Tag]] = relationship("Tag", back_populates="user", cascade="all, delete-orphan")
 
 
 class Preference(Base):
-    """Stores a single user preference record (upserted on every save_preference call)."""
+    """Stores a user's scalar preferences (upserted on every save_preference call).
+
+    ``user_id`` is unique so save_preference can use SQLite's ON CONFLICT upsert.
+    List-valued preferences live in ``user_tags`` (see Tag).
+    """
 
     __tablename__ = "preferences"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), index=True)
-    cuisines_liked: Mapped[list | None] = mapped_column(JSON, default=list)
-    cuisines_disliked: Mapped[list | None] = mapped_column(JSON, default=list)
-    dietary_restrictions: Mapped[list | None] = mapped_column(JSON, default=list)
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), unique=True, index=True)
     price_range: Mapped[str | None] = mapped_column(String, nullable=True)  # "$" | "$$" | "$$$" | "$$$$"
-    liked_place_ids: Mapped[list | None] = mapped_column(JSON, default=list)
-    disliked_place_ids: Mapped[list | None] = mapped_column(JSON, default=list)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user: Mapped[User] = relationship("User", back_populates="preferences")
 
 
+class Tag(Base):
+    """One list-valued preference entry, e.g. (user_id, "cuisines_liked", "Thai").
+
+    The composite primary key lets SQLite dedupe repeated saves on insert, so
+    adding a value never requires reading the existing list back.
+    """
+
+    __tablename__ = "user_tags"
+
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String, primary_key=True)  # e.g. "cuisines_liked"
+    value: Mapped[str] = mapped_column(String, primary_key=True)
+
+    user: Mapped[User] = relationship("User", back_populates="tags")
+
+
 class ApiKey(Base):
     """Issued API keys — stored by the TypeScript gateway but mirrored here
     for audit logging and future server-side validation by the Python agent."""
@@ -71,8 +110,85 @@ class ApiKey(Base):
 
 
 def init_db() -> None:
-    """Create all tables if they don't exist."""
+    """Create all tables if they don't exist and upgrade tables from older schemas."""
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _migrate_list_columns(conn)
+        _migrate_preferences(conn)
+
+
+# JSON list columns the original preferences table had; now rows in user_tags.
+_LEGACY_LIST_COLUMNS = (
+    "cuisines_liked",
+    "cuisines_disliked",
+    "dietary_restrictions",
+    "liked_place_ids",
+    "disliked_place_ids",
+)
+
+
+def _migrate_list_columns(conn: Connection) -> None:
+    """Copy list preferences from legacy JSON columns into ``user_tags``.
+
+    Values are inserted in list order so user_tags' rowid order matches what
+    the user saved, and duplicates are skipped by the primary key. The copied
+    columns are then cleared so the copy runs once per database.
+    """
+    columns = {c["name"] for c in inspect(conn).get_columns("preferences")}
+    legacy = [c for c in _LEGACY_LIST_COLUMNS if c in columns]
+    if not legacy:
+        return
+
+    rows = conn.execute(
+        text(f"SELECT user_id, {', '.join(legacy)} FROM preferences ORDER BY id")
+    ).all()
+    tags = [
+        {"user_id": row.user_id, "kind": kind, "value": value}
+        for row in rows
+        for kind in legacy
+        for value in _legacy_list(getattr(row, kind))
+    ]
+    if tags:
+        conn.execute(
+            text(
+                "INSERT OR IGNORE INTO user_tags (user_id, kind, value) "
+                "VALUES (:user_id, :kind, :value)"
+            ),
+            tags,
+        )
+    conn.execute(
+        text(
+            f"UPDATE preferences SET {', '.join(f'{c} = NULL' for c in legacy)} "
+            f"WHERE {' OR '.join(f'{c} IS NOT NULL' for c in legacy)}"
+        )
+    )
+
+
+def _legacy_list(raw: str | None) -> list:
+    """Decode a legacy JSON list column; SQL NULL, JSON ``null`` and non-lists become []."""
+    value = orjson.loads(raw) if raw else None
+    return value if isinstance(value, list) else []
+
+
+def _migrate_preferences(conn: Connection) -> None:
+    """Make ``preferences.user_id`` unique on databases created before it was.
+
+    save_preference upserts with ON CONFLICT (user_id), which SQLite rejects
+    unless a unique index covers the column. Older databases have a plain
+    ``ix_preferences_user_id``; keep each user's first row (the one the old
+    code read and updated) and rebuild the index as unique.
+    """
+    indexes = inspect(conn).get_indexes("preferences")
+    if any(ix["column_names"] == ["user_id"] and ix["unique"] for ix in indexes):
+        return
+    conn.execute(
+        text(
+            "DELETE FROM preferences WHERE id NOT IN "
+            "(SELECT MIN(id) FROM preferences GROUP BY user_id)"
+        )
+    )
+    conn.execute(text("DROP INDEX IF EXISTS ix_preferences_user_id"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_preferences_user_id ON preferences (user_id)"))
 
 
 def get_session() -> Session:
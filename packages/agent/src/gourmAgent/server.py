@@ -2,25 +2,53 @@
 
 from __future__ import annotations
 
+import functools
+import os
+from collections.abc import Iterator
 from contextlib import asynccontextmanager
+from typing import Any
 
+import anyio.to_thread
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-load_dotenv()
+# Set GOURM_LOAD_DOTENV=0 to skip the .env lookup where the environment is
+# already fully configured (containers, the test suite). Real env vars always
+# take precedence over .env values.
+if os.getenv("GOURM_LOAD_DOTENV") != "0":
+    load_dotenv(override=False)
 
 from gourmAgent import agent as agent_module  # noqa: E402
 from gourmAgent.memory.store import init_db  # noqa: E402
+from gourmAgent.tools import places as places_tools  # noqa: E402
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson — tool_calls carry large nested dicts."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    # agent.run blocks on Anthropic + Places round trips; size the worker
+    # thread pool for concurrent /run requests rather than AnyIO's default 40.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 64
     yield
+    places_tools.close_http_client()
 
 
-app = FastAPI(title="gourmAgent", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="gourmAgent",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 class RunRequest(BaseModel):
@@ -30,23 +58,49 @@ class RunRequest(BaseModel):
 
 
 class RunResponse(BaseModel):
+    """Documents the /run response shape; not used to validate it."""
+
     response: str
     tool_calls: list[dict]
 
 
-@app.post("/run", response_model=RunResponse)
-def run(req: RunRequest) -> RunResponse:
+# tool_calls holds arbitrary nested tool output, so /run returns the agent's
+# result as-is instead of revalidating it through RunResponse.
+@app.post("/run", responses={200: {"model": RunResponse}})
+async def run(req: RunRequest) -> ORJSONResponse:
     try:
-        result = agent_module.run(
-            user_id=req.user_id,
-            message=req.message,
-            location=req.location,
+        result = await anyio.to_thread.run_sync(
+            functools.partial(
+                agent_module.run,
+                user_id=req.user_id,
+                message=req.message,
+                location=req.location,
+            )
         )
-        return RunResponse(**result)
+        return ORJSONResponse({"response": result["response"], "tool_calls": result["tool_calls"]})
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+def _sse(events: Iterator[dict[str, Any]]) -> Iterator[bytes]:
+    """Encode agent events as Server-Sent Events, reporting failures in-band."""
+    try:
+        for event in events:
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    except Exception as exc:
+        yield b"data: " + orjson.dumps({"type": "error", "detail": str(exc)}) + b"\n\n"
+
+
+@app.post("/run/stream")
+def run_stream(req: RunRequest) -> StreamingResponse:
+    events = agent_module.run_stream(
+        user_id=req.user_id,
+        message=req.message,
+        location=req.location,
+    )
+    return StreamingResponse(_sse(events), media_type="text/event-stream")
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
@@ -1,67 +1,136 @@
-"""Google Places API tool definitions for the Claude agent."""
+"""Google Places API (v1) tool definitions for the Claude agent."""
 
 from __future__ import annotations
 
 import os
+import threading
 from typing import Any
+from urllib.parse import quote
+
+import httpx
+import orjson
+
+PLACES_V1_URL = "https://places.googleapis.com/v1/places"
+PLACES_V1_SEARCH_URL = f"{PLACES_V1_URL}:searchText"
+
+# Only the fields each tool returns; Places v1 bills and sends per field.
+_SEARCH_FIELD_MASK = ",".join(
+    [
+        "places.id",
+        "places.displayName",
+        "places.formattedAddress",
+        "places.rating",
+        "places.priceLevel",
+        "places.types",
+        "places.location",
+    ]
+)
+_DETAILS_FIELD_MASK = ",".join(
+    [
+        "displayName",
+        "formattedAddress",
+        "nationalPhoneNumber",
+        "websiteUri",
+        "rating",
+        "priceLevel",
+        "regularOpeningHours",
+        "reviews",
+        "googleMapsUri",
+    ]
+)
 
-import googlemaps
+# Places v1 reports price level as an enum; the tools keep the legacy 0-4 scale.
+_PRICE_LEVELS = {
+    "PRICE_LEVEL_FREE": 0,
+    "PRICE_LEVEL_INEXPENSIVE": 1,
+    "PRICE_LEVEL_MODERATE": 2,
+    "PRICE_LEVEL_EXPENSIVE": 3,
+    "PRICE_LEVEL_VERY_EXPENSIVE": 4,
+}
 
-_client: googlemaps.Client | None = None
+_http_client: httpx.Client | None = None
+_http_client_lock = threading.Lock()
 
 
-def _get_client() -> googlemaps.Client:
-    global _client
-    if _client is None:
-        api_key = os.getenv("GOOGLE_PLACES_API_KEY")
-        if not api_key:
-            raise RuntimeError("GOOGLE_PLACES_API_KEY environment variable is not set")
-        _client = googlemaps.Client(key=api_key)
-    return _client
+def _get_http_client() -> httpx.Client:
+    """Shared HTTP/2 client; connections and TLS sessions are reused across tool calls.
+
+    httpx.Client is thread-safe, so concurrently dispatched tools share one pool.
+    Creation is locked so parallel first calls can't each build (and leak) a client.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                api_key = os.getenv("GOOGLE_PLACES_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GOOGLE_PLACES_API_KEY environment variable is not set")
+                _http_client = httpx.Client(
+                    http2=True,
+                    headers={"X-Goog-Api-Key": api_key},
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                    timeout=10.0,
+                )
+    return _http_client
+
+
+def close_http_client() -> None:
+    """Close the shared HTTP client (called on server shutdown)."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
 
 
 # ---------------------------------------------------------------------------
 # Tool implementations
 # ---------------------------------------------------------------------------
 
-def search_restaurants(query: str, location: str, radius: int = 5000) -> list[dict[str, Any]]:
-    """Search for restaurants using the Google Places Text Search API.
+def search_restaurants(query: str, location: str) -> list[dict[str, Any]]:
+    """Search for restaurants using the Google Places API (v1) Text Search.
+
+    The location is folded into the text query, so no separate geocoding
+    round trip is needed, and a field mask limits the response to the
+    fields returned below.
 
     Args:
         query: Free-text query (e.g. "spicy ramen").
         location: Human-readable location string (e.g. "New York, NY").
-        radius: Search radius in metres (default 5 km).
 
     Returns:
         List of up to 10 place dicts with keys: place_id, name, address,
         rating, price_level, types, location.
     """
-    client = _get_client()
-
-    # Geocode the location string to lat/lng
-    geocode_result = client.geocode(location)
-    if not geocode_result:
-        return []
-    latlng = geocode_result[0]["geometry"]["location"]
-
-    results = client.places(
-        query=f"restaurant {query}",
-        location=latlng,
-        radius=radius,
-        type="restaurant",
+    client = _get_http_client()
+    resp = client.post(
+        PLACES_V1_SEARCH_URL,
+        headers={"Content-Type": "application/json", "X-Goog-FieldMask": _SEARCH_FIELD_MASK},
+        content=orjson.dumps(
+            {
+                "textQuery": f"{query} in {location}",
+                "includedType": "restaurant",
+                "pageSize": 10,
+            }
+        ),
     )
+    resp.raise_for_status()
+    results = orjson.loads(resp.content)
 
     places = []
-    for place in results.get("results", [])[:10]:
+    for place in results.get("places", [])[:10]:
+        latlng = place.get("location")
         places.append(
             {
-                "place_id": place.get("place_id"),
-                "name": place.get("name"),
-                "address": place.get("formatted_address"),
+                "place_id": place.get("id"),
+                "name": place.get("displayName", {}).get("text"),
+                "address": place.get("formattedAddress"),
                 "rating": place.get("rating"),
-                "price_level": place.get("price_level"),  # 0-4
+                "price_level": _PRICE_LEVELS.get(place.get("priceLevel")),  # 0-4
                 "types": place.get("types", []),
-                "location": place.get("geometry", {}).get("location"),
+                "location": (
+                    {"lat": latlng.get("latitude"), "lng": latlng.get("longitude")} if latlng else None
+                ),
             }
         )
     return places
@@ -77,20 +146,40 @@ def get_details(place_id: str) -> dict[str, Any]:
         Dict with name, address, phone, website, rating, price_level,
         opening_hours, reviews, url.
     """
-    client = _get_client()
-    fields = [
-        "name",
-        "formatted_address",
-        "formatted_phone_number",
-        "website",
-        "rating",
-        "price_level",
-        "opening_hours",
-        "reviews",
-        "url",
-    ]
-    result = client.place(place_id=place_id, fields=fields)
-    return result.get("result", {})
+    client = _get_http_client()
+    # place_id comes from the model; quote it so it can only name a single place
+    # resource and can't add path segments or query params to the keyed request.
+    resp = client.get(
+        f"{PLACES_V1_URL}/{quote(place_id, safe='')}",
+        headers={"X-Goog-FieldMask": _DETAILS_FIELD_MASK},
+    )
+    resp.raise_for_status()
+    place = orjson.loads(resp.content)
+
+    hours = place.get("regularOpeningHours")
+    return {
+        "name": place.get("displayName", {}).get("text"),
+        "address": place.get("formattedAddress"),
+        "phone": place.get("nationalPhoneNumber"),
+        "website": place.get("websiteUri"),
+        "rating": place.get("rating"),
+        "price_level": _PRICE_LEVELS.get(place.get("priceLevel")),  # 0-4
+        "opening_hours": (
+            {"open_now": hours.get("openNow"), "weekday_text": hours.get("weekdayDescriptions", [])}
+            if hours
+            else None
+        ),
+        "reviews": [
+            {
+                "author_name": review.get("authorAttribution", {}).get("displayName"),
+                "rating": review.get("rating"),
+                "text": review.get("text", {}).get("text"),
+                "relative_time_description": review.get("relativePublishTimeDescription"),
+            }
+            for review in place.get("reviews", [])
+        ],
+        "url": place.get("googleMapsUri"),
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -115,11 +204,6 @@ TOOLS: list[dict[str, Any]] = [
                     "type": "string",
                     "description": "City or address to search near, e.g. 'San Francisco, CA'",
                 },
-                "radius": {
-                    "type": "integer",
-                    "description": "Search radius in metres (default 5000)",
-                    "default": 5000,
-                },
             },
             "required": ["query", "location"],
         },
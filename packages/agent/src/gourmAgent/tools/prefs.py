@@ -2,9 +2,72 @@
 
 from __future__ import annotations
 
+import threading
+import time
+from datetime import datetime
 from typing import Any
 
-from gourmAgent.memory.store import Preference, User, get_session
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.sqlite import insert
+
+from gourmAgent.memory.store import Preference, Tag, User, engine
+
+_users = User.__table__
+_preferences = Preference.__table__
+_tags = Tag.__table__
+
+# get_preferences runs on nearly every turn and changes rarely, so keep recent
+# reads in-process; save_preference evicts the user's entry after each write.
+# Per-process only — a multi-worker deployment would need a shared cache.
+_PREFS_CACHE_TTL = 30.0  # seconds
+_PREFS_CACHE_MAXSIZE = 1024
+_prefs_cache: dict[str, tuple[float, dict[str, Any]]] = {}  # oldest fill first
+_prefs_lock = threading.Lock()
+
+# Bumped by every save_preference. A read only fills the cache if no save has
+# committed since it started, so a read racing a concurrent save can't cache
+# pre-save data. A single counter (rather than one per user) stays bounded,
+# at the cost of occasionally skipping a fill.
+_prefs_generation = 0
+
+
+def _copy_prefs(prefs: dict[str, Any]) -> dict[str, Any]:
+    """Copy a cached preference dict so callers can't mutate the cache entry."""
+    return {k: list(v) if isinstance(v, list) else v for k, v in prefs.items()}
+
+
+def _cached_prefs(user_id: str) -> tuple[dict[str, Any] | None, int]:
+    """Return (fresh cached prefs or None, current generation)."""
+    with _prefs_lock:
+        cached = _prefs_cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < _PREFS_CACHE_TTL:
+            return _copy_prefs(cached[1]), _prefs_generation
+        return None, _prefs_generation
+
+
+def _store_prefs(user_id: str, prefs: dict[str, Any], generation: int) -> None:
+    """Cache prefs read at ``generation``, unless a save has committed since."""
+    with _prefs_lock:
+        if generation != _prefs_generation:
+            return
+        now = time.monotonic()
+        # Re-insert so the dict stays in fill order, then prune from the front:
+        # expired entries first, then the oldest ones beyond maxsize.
+        _prefs_cache.pop(user_id, None)
+        _prefs_cache[user_id] = (now, prefs)
+        while _prefs_cache:
+            oldest = next(iter(_prefs_cache))
+            expired = now - _prefs_cache[oldest][0] >= _PREFS_CACHE_TTL
+            if not expired and len(_prefs_cache) <= _PREFS_CACHE_MAXSIZE:
+                break
+            del _prefs_cache[oldest]
+
+
+def _invalidate_prefs(user_id: str) -> None:
+    global _prefs_generation
+    with _prefs_lock:
+        _prefs_generation += 1
+        _prefs_cache.pop(user_id, None)
 
 
 # ---------------------------------------------------------------------------
@@ -23,37 +86,38 @@ def save_preference(
     """Persist or update preference data for a user.
 
     Any field left as None is not overwritten (partial update semantics).
+    List values are inserted as ``user_tags`` rows in one statement; SQLite
+    skips ones the user already has, so no read-modify-write is needed.
     """
-    with get_session() as session:
-        user = session.get(User, user_id)
-        if user is None:
-            user = User(id=user_id)
-            session.add(user)
-
-        pref = session.query(Preference).filter_by(user_id=user_id).first()
-        if pref is None:
-            pref = Preference(user_id=user_id)
-            session.add(pref)
-
-        if cuisines_liked is not None:
-            existing = pref.cuisines_liked or []
-            pref.cuisines_liked = list(set(existing) | set(cuisines_liked))
-        if cuisines_disliked is not None:
-            existing = pref.cuisines_disliked or []
-            pref.cuisines_disliked = list(set(existing) | set(cuisines_disliked))
-        if dietary_restrictions is not None:
-            existing = pref.dietary_restrictions or []
-            pref.dietary_restrictions = list(set(existing) | set(dietary_restrictions))
+    incoming = {
+        "cuisines_liked": cuisines_liked,
+        "cuisines_disliked": cuisines_disliked,
+        "dietary_restrictions": dietary_restrictions,
+        "liked_place_ids": liked_place_ids,
+        "disliked_place_ids": disliked_place_ids,
+    }
+    tag_rows = [
+        {"user_id": user_id, "kind": kind, "value": value}
+        for kind, values in incoming.items()
+        if values
+        for value in values
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(insert(_users).values(id=user_id).on_conflict_do_nothing(index_elements=["id"]))
+
+        values: dict[str, Any] = {"updated_at": datetime.utcnow()}
         if price_range is not None:
-            pref.price_range = price_range
-        if liked_place_ids is not None:
-            existing = pref.liked_place_ids or []
-            pref.liked_place_ids = list(set(existing) | set(liked_place_ids))
-        if disliked_place_ids is not None:
-            existing = pref.disliked_place_ids or []
-            pref.disliked_place_ids = list(set(existing) | set(disliked_place_ids))
-
-        session.commit()
+            values["price_range"] = price_range
+        conn.execute(
+            insert(_preferences)
+            .values(user_id=user_id, **values)
+            .on_conflict_do_update(index_elements=["user_id"], set_=values)
+        )
+
+        if tag_rows:
+            conn.execute(insert(_tags).on_conflict_do_nothing(), tag_rows)
+    _invalidate_prefs(user_id)
     return {"status": "ok", "user_id": user_id}
 
 
@@ -61,28 +125,42 @@ def get_preferences(user_id: str) -> dict[str, Any]:
     """Retrieve the stored preferences for a user.
 
     Returns an empty preference dict if the user has no stored preferences.
+    Results are cached for _PREFS_CACHE_TTL seconds.
     """
-    with get_session() as session:
-        pref = session.query(Preference).filter_by(user_id=user_id).first()
-        if pref is None:
-            return {
-                "user_id": user_id,
-                "cuisines_liked": [],
-                "cuisines_disliked": [],
-                "dietary_restrictions": [],
-                "price_range": None,
-                "liked_place_ids": [],
-                "disliked_place_ids": [],
-            }
-        return {
-            "user_id": user_id,
-            "cuisines_liked": pref.cuisines_liked or [],
-            "cuisines_disliked": pref.cuisines_disliked or [],
-            "dietary_restrictions": pref.dietary_restrictions or [],
-            "price_range": pref.price_range,
-            "liked_place_ids": pref.liked_place_ids or [],
-            "disliked_place_ids": pref.disliked_place_ids or [],
-        }
+    prefs, generation = _cached_prefs(user_id)
+    if prefs is not None:
+        return prefs
+
+    prefs = _load_preferences(user_id)
+    _store_prefs(user_id, prefs, generation)
+    return _copy_prefs(prefs)
+
+
+def _load_preferences(user_id: str) -> dict[str, Any]:
+    """Read a user's preferences from the database."""
+    with engine.connect() as conn:
+        price_range = conn.execute(
+            select(_preferences.c.price_range).where(_preferences.c.user_id == user_id)
+        ).scalar()
+        # rowid order is first-insert order, so lists keep the order values were saved in
+        tags = conn.execute(
+            select(_tags.c.kind, _tags.c.value)
+            .where(_tags.c.user_id == user_id)
+            .order_by(literal_column("rowid"))
+        ).all()
+
+    prefs: dict[str, Any] = {
+        "user_id": user_id,
+        "cuisines_liked": [],
+        "cuisines_disliked": [],
+        "dietary_restrictions": [],
+        "price_range": price_range,
+        "liked_place_ids": [],
+        "disliked_place_ids": [],
+    }
+    for kind, value in tags:
+        prefs[kind].append(value)
+    return prefs
 
 
 # ---------------------------------------------------------------------------
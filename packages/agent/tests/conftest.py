@@ -0,0 +1,27 @@
+"""Shared pytest configuration for the gourmAgent tests."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+
+_db_dir: str | None = None
+
+
+def pytest_configure(config):
+    """Set up the environment before gourmAgent is imported.
+
+    memory.store builds its engine at import time, so DATABASE_URL must point at
+    a throwaway SQLite file before any test module imports it; tests then share
+    that one engine. GOURM_LOAD_DOTENV=0 keeps server.py from loading .env.
+    """
+    global _db_dir
+    _db_dir = tempfile.mkdtemp(prefix="gourmAgent-tests-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+    os.environ["GOURM_LOAD_DOTENV"] = "0"
+
+
+def pytest_unconfigure(config):
+    if _db_dir is not None:
+        shutil.rmtree(_db_dir, ignore_errors=True)
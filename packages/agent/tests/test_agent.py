@@ -8,9 +8,11 @@ from __future__ import annotations
 import json
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
+from sqlalchemy import text
 
-from gourmAgent.memory.store import init_db
+from gourmAgent.memory.store import Base, engine, init_db
 from gourmAgent.tools import prefs as prefs_tools
 
 
@@ -19,21 +21,14 @@ from gourmAgent.tools import prefs as prefs_tools
 # ---------------------------------------------------------------------------
 
 @pytest.fixture(autouse=True)
-def in_memory_db(tmp_path, monkeypatch):
-    """Point SQLAlchemy at a fresh in-memory SQLite DB for each test."""
-    db_url = f"sqlite:///{tmp_path / 'test.db'}"
-    monkeypatch.setenv("DATABASE_URL", db_url)
-
-    # Re-import store so the engine picks up the patched env var
-    import importlib
-    import gourmAgent.memory.store as store_module
-    importlib.reload(store_module)
-
-    # Also reload tools that import from store
-    import gourmAgent.tools.prefs as prefs_module
-    importlib.reload(prefs_module)
-
-    store_module.init_db()
+def fresh_db():
+    """Recreate all tables so each test starts from an empty database.
+
+    DATABASE_URL is set once in conftest.py; the engine is shared across tests.
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    prefs_tools._prefs_cache.clear()
     yield
 
 
@@ -68,6 +63,47 @@ class TestPreferenceTools:
         assert "Italian" in prefs["cuisines_liked"]
         assert "Mexican" in prefs["cuisines_liked"]
 
+    def test_save_preference_merge_dedupes_and_keeps_order(self):
+        from gourmAgent.tools.prefs import get_preferences, save_preference
+        save_preference("user4", cuisines_liked=["Thai", "Italian"])
+        save_preference("user4", cuisines_liked=["Italian", "Mexican", "Mexican"])
+        prefs = get_preferences("user4")
+        assert prefs["cuisines_liked"] == ["Thai", "Italian", "Mexican"]
+
+    def test_get_preferences_cache_invalidated_on_save(self):
+        from gourmAgent.tools.prefs import get_preferences, save_preference
+        save_preference("user5", cuisines_liked=["Thai"])
+        assert get_preferences("user5")["cuisines_liked"] == ["Thai"]
+
+        with patch.object(prefs_tools, "engine") as mock_engine:
+            assert get_preferences("user5")["cuisines_liked"] == ["Thai"]
+            mock_engine.connect.assert_not_called()
+
+        save_preference("user5", cuisines_liked=["Korean"])
+        assert get_preferences("user5")["cuisines_liked"] == ["Thai", "Korean"]
+
+    def test_get_preferences_does_not_cache_read_that_raced_a_save(self):
+        from gourmAgent.tools.prefs import get_preferences, save_preference
+        save_preference("user6", cuisines_liked=["Thai"])
+        real_load = prefs_tools._load_preferences
+
+        def load_then_concurrent_save(user_id):
+            prefs = real_load(user_id)
+            save_preference(user_id, cuisines_liked=["Korean"])  # commits before the fill
+            return prefs
+
+        with patch.object(prefs_tools, "_load_preferences", side_effect=load_then_concurrent_save):
+            assert get_preferences("user6")["cuisines_liked"] == ["Thai"]
+
+        assert get_preferences("user6")["cuisines_liked"] == ["Thai", "Korean"]
+
+    def test_get_preferences_cache_is_bounded(self):
+        from gourmAgent.tools.prefs import get_preferences
+        with patch.object(prefs_tools, "_PREFS_CACHE_MAXSIZE", 2):
+            for user_id in ("a", "b", "c"):
+                get_preferences(user_id)
+        assert list(prefs_tools._prefs_cache) == ["b", "c"]
+
     def test_save_preference_partial_update(self):
         from gourmAgent.tools.prefs import get_preferences, save_preference
         save_preference("user3", cuisines_liked=["Thai"], price_range="$$$")
@@ -79,67 +115,198 @@ class TestPreferenceTools:
 
 
 # ---------------------------------------------------------------------------
-# Places tool tests (mocked)
+# Schema migration tests
 # ---------------------------------------------------------------------------
 
-MOCK_GEOCODE = [{"geometry": {"location": {"lat": 37.7749, "lng": -122.4194}}}]
+# The preferences table as created by the original release: JSON list columns
+# and a non-unique index on user_id.
+BASELINE_PREFERENCES_DDL = [
+    "DROP TABLE preferences",
+    """
+    CREATE TABLE preferences (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id VARCHAR NOT NULL REFERENCES users (id),
+        cuisines_liked JSON,
+        cuisines_disliked JSON,
+        dietary_restrictions JSON,
+        price_range VARCHAR,
+        liked_place_ids JSON,
+        disliked_place_ids JSON,
+        updated_at DATETIME
+    )
+    """,
+    "CREATE INDEX ix_preferences_user_id ON preferences (user_id)",
+]
+
+
+def _create_baseline_preferences(rows: list[dict]) -> None:
+    with engine.begin() as conn:
+        for ddl in BASELINE_PREFERENCES_DDL:
+            conn.execute(text(ddl))
+        for row in rows:
+            conn.execute(text("INSERT OR IGNORE INTO users (id) VALUES (:user_id)"), row)
+            conn.execute(
+                text(
+                    "INSERT INTO preferences (user_id, cuisines_liked, cuisines_disliked, price_range) "
+                    "VALUES (:user_id, :cuisines_liked, :cuisines_disliked, :price_range)"
+                ),
+                {"cuisines_liked": None, "cuisines_disliked": None, "price_range": None, **row},
+            )
+
+
+class TestMigrations:
+    def test_init_db_makes_preferences_user_id_unique(self):
+        from gourmAgent.tools.prefs import get_preferences, save_preference
+        _create_baseline_preferences(
+            [
+                {"user_id": "old_user", "price_range": "$$"},
+                {"user_id": "old_user", "price_range": "$$$$"},
+            ]
+        )
+
+        init_db()
+
+        assert get_preferences("old_user")["price_range"] == "$$"
+        save_preference("old_user", price_range="$")
+        assert get_preferences("old_user")["price_range"] == "$"
+
+    def test_init_db_skips_json_null_lists(self):
+        from gourmAgent.tools.prefs import get_preferences
+        # SQLAlchemy's JSON type stores a Python None as the JSON text 'null'
+        _create_baseline_preferences(
+            [{"user_id": "old_user", "cuisines_liked": '["Thai"]', "cuisines_disliked": "null"}]
+        )
+
+        init_db()
+
+        prefs = get_preferences("old_user")
+        assert prefs["cuisines_liked"] == ["Thai"]
+        assert prefs["cuisines_disliked"] == []
+
+    def test_init_db_copies_json_lists_into_tags(self):
+        from gourmAgent.tools.prefs import get_preferences, save_preference
+        _create_baseline_preferences(
+            [{"user_id": "old_user", "cuisines_liked": '["Thai", "Korean", "Italian"]'}]
+        )
+
+        init_db()
+        init_db()  # a second boot must not duplicate or reorder anything
+
+        assert get_preferences("old_user")["cuisines_liked"] == ["Thai", "Korean", "Italian"]
+        save_preference("old_user", cuisines_liked=["Korean", "Mexican"])
+        assert get_preferences("old_user")["cuisines_liked"] == ["Thai", "Korean", "Italian", "Mexican"]
+
+
+# ---------------------------------------------------------------------------
+# Places tool tests (mocked)
+# ---------------------------------------------------------------------------
 
 MOCK_PLACES_RESULT = {
-    "results": [
+    "places": [
         {
-            "place_id": "ChIJtest1",
-            "name": "Ramen House",
-            "formatted_address": "123 Main St, San Francisco, CA",
+            "id": "ChIJtest1",
+            "displayName": {"text": "Ramen House", "languageCode": "en"},
+            "formattedAddress": "123 Main St, San Francisco, CA",
             "rating": 4.5,
-            "price_level": 2,
+            "priceLevel": "PRICE_LEVEL_MODERATE",
             "types": ["restaurant", "food"],
-            "geometry": {"location": {"lat": 37.77, "lng": -122.41}},
+            "location": {"latitude": 37.77, "longitude": -122.41},
         },
         {
-            "place_id": "ChIJtest2",
-            "name": "Spicy Noodles",
-            "formatted_address": "456 Market St, San Francisco, CA",
+            "id": "ChIJtest2",
+            "displayName": {"text": "Spicy Noodles", "languageCode": "en"},
+            "formattedAddress": "456 Market St, San Francisco, CA",
             "rating": 4.2,
-            "price_level": 1,
+            "priceLevel": "PRICE_LEVEL_INEXPENSIVE",
             "types": ["restaurant", "food"],
-            "geometry": {"location": {"lat": 37.78, "lng": -122.42}},
+            "location": {"latitude": 37.78, "longitude": -122.42},
         },
     ]
 }
 
 
 class TestPlacesTools:
-    @patch("gourmAgent.tools.places.googlemaps.Client")
-    def test_search_restaurants_returns_results(self, MockClient):
-        mock_instance = MockClient.return_value
-        mock_instance.geocode.return_value = MOCK_GEOCODE
-        mock_instance.places.return_value = MOCK_PLACES_RESULT
+    def test_search_restaurants_returns_results(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json=MOCK_PLACES_RESULT)
 
         # Force re-init of the module-level client
         import gourmAgent.tools.places as places_module
-        places_module._client = mock_instance
+        places_module._http_client = httpx.Client(transport=httpx.MockTransport(handler))
 
         results = places_module.search_restaurants("ramen", "San Francisco, CA")
         assert len(results) == 2
         assert results[0]["name"] == "Ramen House"
         assert results[0]["rating"] == 4.5
+        assert results[0]["price_level"] == 2
+        assert results[0]["location"] == {"lat": 37.77, "lng": -122.41}
 
-    @patch("gourmAgent.tools.places.googlemaps.Client")
-    def test_get_details_returns_place_info(self, MockClient):
-        mock_instance = MockClient.return_value
-        mock_instance.place.return_value = {
-            "result": {
-                "name": "Ramen House",
-                "formatted_address": "123 Main St",
-                "rating": 4.5,
-            }
-        }
+        assert len(requests) == 1
+        assert "places.displayName" in requests[0].headers["X-Goog-FieldMask"]
+        assert json.loads(requests[0].content)["textQuery"] == "ramen in San Francisco, CA"
+
+    def test_http_client_created_once_under_concurrent_first_use(self, monkeypatch):
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        import gourmAgent.tools.places as places_module
+        monkeypatch.setenv("GOOGLE_PLACES_API_KEY", "test-key")
+        places_module._http_client = None
+
+        def slow_client(**kwargs):
+            time.sleep(0.05)  # widen the window between the None check and assignment
+            return MagicMock()
+
+        with patch.object(places_module.httpx, "Client", side_effect=slow_client) as mock_client:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                clients = list(executor.map(lambda _: places_module._get_http_client(), range(4)))
+
+        assert mock_client.call_count == 1
+        assert all(c is clients[0] for c in clients)
+        places_module.close_http_client()
+
+    def test_get_details_returns_place_info(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(
+                200,
+                json={
+                    "displayName": {"text": "Ramen House"},
+                    "formattedAddress": "123 Main St",
+                    "rating": 4.5,
+                    "regularOpeningHours": {"openNow": True, "weekdayDescriptions": ["Monday: 11AM-9PM"]},
+                },
+            )
 
         import gourmAgent.tools.places as places_module
-        places_module._client = mock_instance
+        places_module._http_client = httpx.Client(transport=httpx.MockTransport(handler))
 
         details = places_module.get_details("ChIJtest1")
         assert details["name"] == "Ramen House"
+        assert details["address"] == "123 Main St"
+        assert details["opening_hours"]["open_now"] is True
+        assert details["reviews"] == []
+        assert requests[0].url.path == "/v1/places/ChIJtest1"
+        assert "reviews" in requests[0].headers["X-Goog-FieldMask"]
+
+    def test_get_details_quotes_place_id(self):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={})
+
+        import gourmAgent.tools.places as places_module
+        places_module._http_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        places_module.get_details("../other?fields=*")
+        assert requests[0].url.raw_path == b"/v1/places/..%2Fother%3Ffields%3D%2A"
+        assert requests[0].url.query == b""
 
 
 # ---------------------------------------------------------------------------
@@ -158,6 +325,15 @@ class TestAgentRun:
         response.content = [block]
         return response
 
+    def _make_tool_use(self, tu_id: str, name: str, inputs: dict):
+        """Build a mock Anthropic tool_use block."""
+        block = MagicMock()
+        block.type = "tool_use"
+        block.id = tu_id
+        block.name = name
+        block.input = inputs
+        return block
+
     @patch("gourmAgent.agent.anthropic.Anthropic")
     def test_agent_returns_response(self, MockAnthropic):
         mock_client = MockAnthropic.return_value
@@ -175,3 +351,92 @@ class TestAgentRun:
         )
         assert "ramen" in result["response"].lower() or "spots" in result["response"].lower()
         assert isinstance(result["tool_calls"], list)
+
+        params = mock_client.messages.create.call_args.kwargs
+        assert params["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert params["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+
+    @patch("gourmAgent.agent.anthropic.Anthropic")
+    def test_agent_runs_multiple_tool_uses_in_order(self, MockAnthropic):
+        tool_response = MagicMock()
+        tool_response.stop_reason = "tool_use"
+        tool_response.content = [
+            self._make_tool_use("tu_1", "get_preferences", {"user_id": "alice"}),
+            self._make_tool_use("tu_2", "get_preferences", {"user_id": "bob"}),
+        ]
+
+        mock_client = MockAnthropic.return_value
+        mock_client.messages.create.side_effect = [
+            tool_response,
+            self._make_text_response("Done!"),
+        ]
+
+        import gourmAgent.agent as agent_module
+        agent_module._client = mock_client
+
+        result = agent_module.run(user_id="u1", message="hi", location="San Francisco, CA")
+
+        assert [json.loads(c["output"])["user_id"] for c in result["tool_calls"]] == ["alice", "bob"]
+        tool_results = mock_client.messages.create.call_args.kwargs["messages"][-1]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["tu_1", "tu_2"]
+
+    def test_duplicate_tool_uses_dispatch_once(self):
+        import gourmAgent.agent as agent_module
+
+        tool_uses = [
+            self._make_tool_use("tu_1", "search_restaurants", {"query": "ramen", "location": "SF"}),
+            self._make_tool_use("tu_2", "search_restaurants", {"location": "SF", "query": "ramen"}),
+            self._make_tool_use("tu_3", "search_restaurants", {"query": "sushi", "location": "SF"}),
+        ]
+        with patch.object(agent_module, "_dispatch_tool", return_value=[]) as mock_dispatch:
+            tool_calls, tool_results = agent_module._execute_tools(tool_uses)
+
+        assert mock_dispatch.call_count == 2
+        assert [r["tool_use_id"] for r in tool_results] == ["tu_1", "tu_2", "tu_3"]
+        assert len(tool_calls) == 3
+
+    @patch("gourmAgent.agent.anthropic.Anthropic")
+    def test_agent_run_stream_yields_text_then_done(self, MockAnthropic):
+        stream = MagicMock()
+        stream.text_stream = iter(["Here are ", "3 ramen spots!"])
+        stream.get_final_message.return_value = self._make_text_response(
+            "Here are 3 ramen spots!"
+        )
+
+        mock_client = MockAnthropic.return_value
+        mock_client.messages.stream.return_value.__enter__.return_value = stream
+
+        import gourmAgent.agent as agent_module
+        agent_module._client = mock_client
+
+        events = list(
+            agent_module.run_stream(user_id="u1", message="Find me ramen", location="San Francisco, CA")
+        )
+        assert [e["text"] for e in events if e["type"] == "text"] == ["Here are ", "3 ramen spots!"]
+        assert events[-1] == {"type": "done", "response": "Here are 3 ramen spots!", "tool_calls": []}
+
+
+# ---------------------------------------------------------------------------
+# Server tests (agent.run mocked)
+# ---------------------------------------------------------------------------
+
+class TestServer:
+    @patch("gourmAgent.agent.run")
+    def test_run_endpoint_serializes_tool_calls(self, mock_run):
+        from fastapi.testclient import TestClient
+
+        from gourmAgent.server import app
+
+        mock_run.return_value = {
+            "response": "Try Ramen House!",
+            "tool_calls": [
+                {"tool": "get_preferences", "input": {"user_id": "u1"}, "output": "{}", "error": False}
+            ],
+        }
+
+        resp = TestClient(app).post(
+            "/run",
+            json={"user_id": "u1", "message": "Find me ramen", "location": "San Francisco, CA"},
+        )
+        assert resp.status_code == 200
+        assert resp.json() == mock_run.return_value